@@ -1,10 +1,15 @@
+import asyncio
+import json
 import re
-from typing import List, Dict
-from openai import AzureOpenAI
+from typing import List, Dict, Optional
+from openai import AsyncAzureOpenAI, InternalServerError, RateLimitError
 import os
 from dotenv import load_dotenv
 
+from classifier.llm_cache import get_cached_label, get_cached_labels, store_label, store_labels
+from configurations.config import LLM_BATCH_SIZE, LLM_MAX_CONCURRENCY, USE_BATCH_API
 from email_ops.email_reader import read_read_emails
+from prompts.email_agent_prompts import truncate_body
 
 # ---------------------------------------------------------
 # 🔹 Load environment
@@ -16,29 +21,61 @@ AZURE_OPENAI_ENDPOINT = os.getenv("azure_openai_endpoint")
 AZURE_OPENAI_API_VERSION = os.getenv("azure_openai_api_version")
 AZURE_OPENAI_DEPLOYMENT = os.getenv("azure_openai_deployment")  # your LLM deployment name
 
-client = AzureOpenAI(
-    api_key=AZURE_OPENAI_API_KEY,
-    api_version=AZURE_OPENAI_API_VERSION,
-    azure_endpoint=AZURE_OPENAI_ENDPOINT,
-)
+LLM_MAX_ATTEMPTS = 3  # tries per request on 429 / 5xx, with exponential backoff
+
+# Label matchers for model output, compiled once rather than on every response
+_HIGH_RE = re.compile(r"\bhigh\b", re.IGNORECASE)
+_LOW_RE = re.compile(r"\blow\b", re.IGNORECASE)
+
+
+def _new_client() -> AsyncAzureOpenAI:
+    """
+    Async clients are bound to the event loop they first run on,
+    so one is opened per asyncio.run() instead of at import time.
+    Retries are handled by _chat_completion, not the SDK.
+    """
+    return AsyncAzureOpenAI(
+        api_key=AZURE_OPENAI_API_KEY,
+        api_version=AZURE_OPENAI_API_VERSION,
+        azure_endpoint=AZURE_OPENAI_ENDPOINT,
+        max_retries=0,
+    )
+
 
 # ---------------------------------------------------------
-# 🔹 LLM-based Classification Functions
+# 🔹 Prompt Templates
 # ---------------------------------------------------------
-def classify_email_llm(email: Dict[str, str]) -> str:
-    """Use Azure OpenAI to classify email priority based on context."""
-    subject = email.get("subject", "")
-    body = email.get("body", "")
-    combined = f"Subject: {subject}\n\nBody: {body}"
-
-    prompt = f"""
+CLASSIFIER_TASK = """
 You are an intelligent email classifier.
 
 Your task:
 - Determine if this email is *High Priority* or *Low Priority*.
 - High priority includes job opportunities, recruiter messages, interviews, AI/ML project offers, urgent tasks, or time-sensitive work.
 - Low priority includes newsletters, ads, or casual discussions.
+"""
 
+BATCH_INSTRUCTIONS = (
+    "Classify each email below. Reply with a JSON object of the form "
+    '{"labels": ["High", "Low", ...]} holding exactly one label per email, in order.'
+)
+
+
+def normalize_label(raw_output: str) -> Optional[str]:
+    """Map a raw model answer onto 'High Priority' / 'Low Priority' (None if unclear)."""
+    if _HIGH_RE.search(raw_output):
+        return "High Priority"
+    elif _LOW_RE.search(raw_output):
+        return "Low Priority"
+    return None
+
+
+def build_prompt(email: Dict[str, str]) -> str:
+    """Single-email prompt asking for a bare 'High Priority' / 'Low Priority' answer."""
+    subject = email.get("subject", "")
+    body = truncate_body(email.get("body", ""))
+    combined = f"Subject: {subject}\n\nBody: {body}"
+
+    return f"""{CLASSIFIER_TASK}
 Output format: only respond with one of these exactly:
 - High Priority
 - Low Priority
@@ -47,43 +84,147 @@ Email content:
 {combined}
 """
 
-    try:
-        response = client.chat.completions.create(
-            model=AZURE_OPENAI_DEPLOYMENT,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.0,
-        )
 
-        raw_output = response.choices[0].message.content.strip()
+def build_batch_prompt(emails: List[Dict[str, str]]) -> str:
+    """Pack several emails into one numbered prompt sharing the instruction preamble."""
+    items = "\n".join(
+        f"{idx}. Subject: {e.get('subject', '')}\n   Body: {truncate_body(e.get('body', ''))}"
+        for idx, e in enumerate(emails, start=1)
+    )
+    return f"{CLASSIFIER_TASK}\n{BATCH_INSTRUCTIONS}\n\n{items}\n"
+
+
+async def _chat_completion(client: AsyncAzureOpenAI, prompt: str, **kwargs) -> str:
+    """Run one chat completion, backing off exponentially on rate limits and server errors."""
+    for attempt in range(1, LLM_MAX_ATTEMPTS + 1):
+        try:
+            response = await client.chat.completions.create(
+                model=AZURE_OPENAI_DEPLOYMENT,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.0,
+                **kwargs,
+            )
+            return response.choices[0].message.content.strip()
+
+        except (RateLimitError, InternalServerError) as e:
+            if attempt == LLM_MAX_ATTEMPTS:
+                raise
+            delay = 2 ** (attempt - 1)
+            print(f"[LLM Classifier] ⏳ {type(e).__name__}, retrying in {delay}s ({attempt}/{LLM_MAX_ATTEMPTS})...")
+            await asyncio.sleep(delay)
+
+
+# ---------------------------------------------------------
+# 🔹 LLM-based Classification Functions
+# ---------------------------------------------------------
+async def _classify_async(client: AsyncAzureOpenAI, email: Dict[str, str]) -> str:
+    """Use Azure OpenAI to classify email priority based on context."""
+    try:
+        raw_output = await _chat_completion(client, build_prompt(email))
         print(f"[LLM Raw Output] {raw_output}")
 
         # -------------------------------------------------
         # ✅ Robust normalization and regex fallback
         # -------------------------------------------------
-        if re.search(r"\bhigh\b", raw_output, re.IGNORECASE):
-            return "High Priority"
-        elif re.search(r"\blow\b", raw_output, re.IGNORECASE):
-            return "Low Priority"
-        else:
+        label = normalize_label(raw_output)
+        if label is None:
             print("[LLM Classifier] ⚠️ Unclear output, defaulting to Low Priority.")
             return "Low Priority"
+        store_label(email, label)
+        return label
 
     except Exception as e:
         print(f"[LLM Classifier] ❌ Failed to classify email: {e}")
         return "Low Priority"
 
 
-def classify_emails_bulk_llm(emails: List[Dict[str, str]]) -> List[Dict[str, str]]:
-    """Classify multiple emails using Azure OpenAI."""
-    classified = []
+async def _classify_batch_async(client: AsyncAzureOpenAI, emails: List[Dict[str, str]]) -> List[str]:
+    """
+    Classify a chunk of emails with a single chat completion.
+    Falls back to per-email classification if the JSON reply can't be used.
+    """
+    try:
+        raw_output = await _chat_completion(
+            client,
+            build_batch_prompt(emails),
+            response_format={"type": "json_object"},
+        )
+        print(f"[LLM Raw Output] {raw_output}")
+
+        labels = json.loads(raw_output).get("labels")
+        if not isinstance(labels, list) or len(labels) != len(emails):
+            raise ValueError(f"expected {len(emails)} labels, got {labels!r}")
+
+    except Exception as e:
+        print(f"[LLM Classifier] ⚠️ Batch classification failed ({e}). Falling back to per-email calls.")
+        return [await _classify_async(client, e) for e in emails]
+
+    results, fresh = [], []
+    for e, label in zip(emails, labels):
+        normalized = normalize_label(str(label))
+        if normalized:
+            fresh.append((e, normalized))
+            results.append(normalized)
+        else:
+            # Unclear individual labels are retried on their own
+            results.append(await _classify_async(client, e))
+
+    store_labels(fresh)
+    return results
+
+
+async def classify_emails_bulk_llm_async(emails: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """
+    Classify multiple emails using Azure OpenAI.
+    Emails are packed LLM_BATCH_SIZE per request and at most
+    LLM_MAX_CONCURRENCY requests are in flight at once.
+    """
     print(f"[LLM Classifier] Starting classification for {len(emails)} emails...")
 
-    for e in emails:
-        e["priority"] = classify_email_llm(e)
-        classified.append(e)
+    pending = []
+    for e, cached in zip(emails, get_cached_labels(emails)):
+        if cached:
+            e["priority"] = cached
+        else:
+            pending.append(e)
+    print(f"[LLM Classifier] 💾 {len(emails) - len(pending)} cache hit(s), {len(pending)} email(s) sent to the LLM.")
+
+    sem = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+    async with _new_client() as client:
+
+        async def _one(chunk: List[Dict[str, str]]) -> None:
+            async with sem:
+                labels = await _classify_batch_async(client, chunk)
+            for e, label in zip(chunk, labels):
+                e["priority"] = label
+
+        await asyncio.gather(*[
+            _one(pending[start:start + LLM_BATCH_SIZE])
+            for start in range(0, len(pending), LLM_BATCH_SIZE)
+        ])
+
+    print(f"[LLM Classifier] ✅ Completed classification for {len(emails)} emails.")
+    return list(emails)
+
 
-    print(f"[LLM Classifier] ✅ Completed classification for {len(classified)} emails.")
-    return classified
+async def _classify_one_async(email: Dict[str, str]) -> str:
+    async with _new_client() as client:
+        return await _classify_async(client, email)
+
+
+def classify_email_llm(email: Dict[str, str]) -> str:
+    """Synchronous wrapper: classify a single email (cached labels are reused)."""
+    cached = get_cached_label(email)
+    if cached:
+        print(f"[LLM Classifier] 💾 Cache hit: {cached}")
+        return cached
+    return asyncio.run(_classify_one_async(email))
+
+
+def classify_emails_bulk_llm(emails: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Synchronous wrapper around classify_emails_bulk_llm_async for existing callers."""
+    return asyncio.run(classify_emails_bulk_llm_async(emails))
 
 
 # ---------------------------------------------------------
@@ -98,8 +239,22 @@ if __name__ == "__main__":
     emails = read_read_emails(START_DATE, END_DATE, LIMIT)
     print(f"[MAIN] Retrieved {len(emails)} emails.\n")
 
-    print("[Main] Running LLM-based classification...")
-    labeled = classify_emails_bulk_llm(emails)
+    if USE_BATCH_API:
+        from classifier.llm_batch import poll_and_apply, submit_batch
+        from databases.email_db import init_db, insert_emails
+
+        print("[Main] Submitting emails to the Batch API...")
+        init_db()
+        insert_emails(emails)
+        batch_id = submit_batch(emails)
+        if batch_id:
+            priorities = poll_and_apply(batch_id)
+            for e in emails:
+                e["priority"] = priorities.get(e["id"], "Unclassified")
+        labeled = emails
+    else:
+        print("[Main] Running LLM-based classification...")
+        labeled = classify_emails_bulk_llm(emails)
 
     for e in labeled:
         print("=" * 60)
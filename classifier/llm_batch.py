@@ -0,0 +1,95 @@
+"""
+llm_batch.py — Offline classification via the Azure OpenAI Batch API
+----------------------------------------------------------------------
+For backfills and scheduled digests where latency doesn't matter:
+one JSONL file of chat-completion requests is uploaded and processed
+asynchronously by the provider (~50% cheaper, outside synchronous RPM limits).
+Results are mapped back onto the stored emails by custom_id (= email ID).
+"""
+
+import json
+import time
+from typing import List, Dict, Optional
+
+from openai import AzureOpenAI
+
+from classifier.llm_agent import (
+    AZURE_OPENAI_API_KEY,
+    AZURE_OPENAI_API_VERSION,
+    AZURE_OPENAI_DEPLOYMENT,
+    AZURE_OPENAI_ENDPOINT,
+    build_prompt,
+    normalize_label,
+)
+from databases.email_db import update_priorities
+
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+client = AzureOpenAI(
+    api_key=AZURE_OPENAI_API_KEY,
+    api_version=AZURE_OPENAI_API_VERSION,
+    azure_endpoint=AZURE_OPENAI_ENDPOINT,
+)
+
+
+def _batch_line(email: Dict[str, str]) -> str:
+    return json.dumps({
+        "custom_id": email["id"],
+        "method": "POST",
+        "url": "/chat/completions",
+        "body": {
+            "model": AZURE_OPENAI_DEPLOYMENT,
+            "messages": [{"role": "user", "content": build_prompt(email)}],
+            "temperature": 0.0,
+        },
+    })
+
+
+def submit_batch(emails: List[Dict[str, str]]) -> Optional[str]:
+    """Upload one classification request per email and start a batch job. Returns the batch ID."""
+    if not emails:
+        print("[LLM Batch] ⚠️ No emails to submit.")
+        return None
+
+    jsonl = "\n".join(_batch_line(e) for e in emails).encode("utf-8")
+    batch_file = client.files.create(file=("classify_emails.jsonl", jsonl), purpose="batch")
+
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/chat/completions",
+        completion_window="24h",
+    )
+    print(f"[LLM Batch] 📤 Submitted {len(emails)} email(s) as batch {batch.id}")
+    return batch.id
+
+
+def poll_and_apply(batch_id: str, poll_interval: int = 60) -> Dict[str, str]:
+    """
+    Wait for a batch job to finish, then write the resulting priorities into the DB.
+    Returns the {email_id: priority} mapping that was applied.
+    """
+    batch = client.batches.retrieve(batch_id)
+    while batch.status not in TERMINAL_STATUSES:
+        print(f"[LLM Batch] ⏳ Batch {batch_id} is {batch.status}, checking again in {poll_interval}s...")
+        time.sleep(poll_interval)
+        batch = client.batches.retrieve(batch_id)
+
+    if batch.status != "completed" or not batch.output_file_id:
+        print(f"[LLM Batch] ❌ Batch {batch_id} ended with status '{batch.status}'.")
+        return {}
+
+    priorities = {}
+    for line in client.files.content(batch.output_file_id).text.splitlines():
+        if not line.strip():
+            continue
+        result = json.loads(line)
+        try:
+            raw_output = result["response"]["body"]["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            print(f"[LLM Batch] ⚠️ No completion for email ID {result.get('custom_id')}, leaving it unclassified.")
+            continue
+        priorities[result["custom_id"]] = normalize_label(raw_output) or "Low Priority"
+
+    update_priorities(priorities)
+    print(f"[LLM Batch] ✅ Applied {len(priorities)} classification(s) from batch {batch_id}.")
+    return priorities
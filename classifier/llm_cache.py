@@ -0,0 +1,88 @@
+"""
+llm_cache.py — Persistent cache of LLM priority labels
+-------------------------------------------------------
+Classification runs at temperature 0, so identical emails (newsletter blasts,
+recruiter templates, re-fetched messages) always get the same label.
+Labels (and the model's reason, when it gave one) are stored in SQLite keyed by
+a hash of sender + subject + body prefix and reused instead of paying for
+another LLM round-trip — across runs, too, since scheduled windows overlap.
+Only real model answers are cached — error fallbacks are never stored.
+"""
+
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
+
+CACHE_DB_PATH = "llm_cache.db"
+KEY_BODY_CHARS = 2048  # body prefix hashed into the key (the LLM sees less than this)
+SCHEMA_VERSION = 1  # PRAGMA user_version once classify_cache exists and llm_labels is gone
+
+# One connection per thread, opened lazily and reused
+_local = threading.local()
+
+
+def _connect() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(CACHE_DB_PATH)
+        # Schema setup runs once per database file, not once per thread
+        if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS classify_cache (
+                    key TEXT PRIMARY KEY,
+                    priority TEXT NOT NULL,
+                    reason TEXT,
+                    created_at TEXT
+                )
+            """)
+            conn.execute("DROP TABLE IF EXISTS llm_labels")  # pre-sender keys, never hit again
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.commit()
+        _local.conn = conn
+    return conn
+
+
+def cache_key(email: Dict[str, str]) -> str:
+    """Stable content hash of an email's sender, subject and body prefix."""
+    content = f"{email.get('from', '')}\0{email.get('subject', '')}\0{email.get('body', '')[:KEY_BODY_CHARS]}"
+    return hashlib.blake2b(content.encode("utf-8", errors="ignore"), digest_size=16).hexdigest()
+
+
+def get_cached_labels(emails: List[Dict[str, str]]) -> List[Optional[str]]:
+    """Cached priority for each email (None on a miss), in input order."""
+    if not emails:
+        return []
+
+    keys = [cache_key(e) for e in emails]
+    conn = _connect()
+    rows = conn.execute(
+        f"SELECT key, priority FROM classify_cache WHERE key IN ({','.join('?' * len(keys))})",
+        keys,
+    ).fetchall()
+
+    found = dict(rows)
+    return [found.get(k) for k in keys]
+
+
+def get_cached_label(email: Dict[str, str]) -> Optional[str]:
+    return get_cached_labels([email])[0]
+
+
+def store_labels(labeled: List[Tuple]) -> None:
+    """Persist (email, priority) or (email, priority, reason) tuples produced by the LLM."""
+    if not labeled:
+        return
+
+    now = datetime.now().isoformat()
+    conn = _connect()
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO classify_cache (key, priority, reason, created_at) VALUES (?, ?, ?, ?)",
+            [(cache_key(e), priority, reason[0] if reason else None, now) for e, priority, *reason in labeled],
+        )
+
+
+def store_label(email: Dict[str, str], priority: str, reason: Optional[str] = None) -> None:
+    store_labels([(email, priority, reason)])
@@ -10,56 +10,255 @@ with automatic fallback and centralized control.
 
 import json
 import re
+import threading
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Set, Tuple
 
-from configurations.config import CLASSIFICATION_MODE
+try:
+    import hyperscan  # optional SIMD multi-pattern matcher (Linux wheels only)
+except ImportError:
+    hyperscan = None
+
+from classifier.llm_cache import get_cached_label, get_cached_labels, store_label, store_labels
+from configurations.config import (
+    BULK_SENDER_DOMAINS,
+    CASCADE_ENABLED,
+    CLASSIFICATION_MODE,
+    LLM_BATCH_SIZE,
+    PRE_CLASSIFY_ENABLED,
+)
+from configurations.utils import load_from_cache, save_to_cache
 from email_ops.email_reader import read_read_emails
-from llm_gateway.azure_openai_llm import classify_with_llm  # new helper file
-from prompts.email_agent_prompts import EMAIL_CLASSIFIER_PROMPTS
+from llm_gateway.azure_openai_llm import (  # new helper file
+    LLM_FALLBACK_RESPONSE,
+    classify_with_llm,
+    classify_with_llm_batch,
+)
+from prompts.email_agent_prompts import truncate_body
+
+RULES_PATH = Path("configurations/priority_rules.json")
+
+# ASCII word runs: exactly the units that \b fences (re.ASCII) delimit
+TOKEN_RE = re.compile(r"\w+", re.ASCII)
+
+
+def compile_keywords(keywords: List[str]) -> re.Pattern:
+    """
+    Compile a keyword list into one word-fenced alternation (longest phrases first).
+    re.ASCII keeps \\b an ASCII word check, matching Hyperscan's default semantics.
+    """
+    alternatives = sorted({k.lower() for k in keywords}, key=len, reverse=True)
+    return re.compile(r"\b(?:" + "|".join(map(re.escape, alternatives)) + r")\b", re.ASCII)
+
+
+def split_keywords(keywords: List[str]) -> Tuple[Set[str], List[Tuple[Set[str], str, re.Pattern]]]:
+    """
+    Split keywords into single words (matched by set lookup against the email's tokens)
+    and multi-word phrases (matched by regex, but only when all their words occur).
+    """
+    words, phrases = set(), []
+    for k in sorted({k.lower() for k in keywords}):
+        if TOKEN_RE.fullmatch(k):
+            words.add(k)
+        else:
+            phrases.append((set(TOKEN_RE.findall(k)), k, compile_keywords([k])))
+    return words, phrases
+
+
+def compile_hyperscan(keywords: List[str]):
+    """Compile a keyword list into a Hyperscan block-mode database (one expression ID per keyword)."""
+    unique = sorted({k.lower() for k in keywords})
+    db = hyperscan.Database()
+    db.compile(
+        expressions=[rb"\b" + re.escape(k).encode("utf-8") + rb"\b" for k in unique],
+        ids=list(range(len(unique))),
+        elements=len(unique),
+        # SINGLEMATCH: each keyword is reported at most once per scan
+        flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH] * len(unique),
+    )
+    return db
+
 
 # ---------------------------------------------------------
-# 🔹 Load Rules from JSON
+# 🔹 Load Rules from JSON (cached build)
 # ---------------------------------------------------------
-RULES_PATH = Path("configurations/priority_rules.json")
+def _rules_fingerprint() -> str:
+    stat = RULES_PATH.stat()
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def _build_classifier_state(fingerprint: str) -> dict:
+    """Parse priority_rules.json and compile the Hyperscan databases (serialized, so they can be pickled)."""
+    with open(RULES_PATH, "r") as f:
+        rules = json.load(f)
 
-with open(RULES_PATH, "r") as f:
-    rules = json.load(f)
+    high_keywords = [k for keywords in rules["high_priority"].values() for k in keywords]
+    low_terms = rules["low_priority"]
 
-HIGH_PRIORITY_KEYWORDS = []
-for category, keywords in rules["high_priority"].items():
-    HIGH_PRIORITY_KEYWORDS.extend(keywords)
+    state = {
+        "fingerprint": fingerprint,
+        "high_keywords": high_keywords,
+        "low_terms": low_terms,
+        "threshold": rules.get("threshold", 2),
+        "high_db": None,
+        "low_db": None,
+    }
+    if hyperscan is not None:
+        state["high_db"] = hyperscan.dumpb(compile_hyperscan(high_keywords))
+        state["low_db"] = hyperscan.dumpb(compile_hyperscan(low_terms))
+    return state
 
-LOW_PRIORITY_TERMS = rules["low_priority"]
-THRESHOLD = rules.get("threshold", 2)
+
+def load_classifier_state() -> dict:
+    """
+    Reuse the pickled rules + compiled databases from configurations/cache while
+    priority_rules.json is unchanged (same mtime and size); rebuild otherwise.
+    """
+    fingerprint = _rules_fingerprint()
+    state = load_from_cache("classifier", "rules")
+
+    stale = (
+        state is None
+        or state.get("fingerprint") != fingerprint
+        or (hyperscan is not None and state.get("high_db") is None)
+    )
+    if stale:
+        state = _build_classifier_state(fingerprint)
+        save_to_cache(state, "classifier", "rules")
+    return state
+
+
+_state = load_classifier_state()
+
+HIGH_PRIORITY_KEYWORDS = _state["high_keywords"]
+LOW_PRIORITY_TERMS = _state["low_terms"]
+THRESHOLD = _state["threshold"]
+
+# Regex fallback: one tokenization per email, then set lookups
+HIGH_WORDS, HIGH_PHRASES = split_keywords(HIGH_PRIORITY_KEYWORDS)
+LOW_WORDS, LOW_PHRASES = split_keywords(LOW_PRIORITY_TERMS)
+
+HIGH_DB = LOW_DB = None
+if hyperscan is not None:
+    try:
+        HIGH_DB = hyperscan.loadb(_state["high_db"], hyperscan.HS_MODE_BLOCK)
+        LOW_DB = hyperscan.loadb(_state["low_db"], hyperscan.HS_MODE_BLOCK)
+    except Exception:
+        # Serialized by a different Hyperscan build: compile fresh
+        HIGH_DB = compile_hyperscan(HIGH_PRIORITY_KEYWORDS)
+        LOW_DB = compile_hyperscan(LOW_PRIORITY_TERMS)
+
+# Hyperscan scratch space must not be shared between concurrent scans
+_hs_local = threading.local()
+
+
+def _on_match(expr_id, start, end, flags, hits):
+    hits.add(expr_id)
+
+
+def _count_hyperscan(db, buffers: List[bytes]) -> int:
+    """Number of distinct keywords of `db` present in any of `buffers`."""
+    scratches = _hs_local.__dict__.setdefault("scratches", {})
+    scratch = scratches.get(id(db))
+    if scratch is None:
+        scratch = scratches[id(db)] = hyperscan.Scratch(db)
+
+    hits = set()
+    for data in buffers:
+        db.scan(data, match_event_handler=_on_match, context=hits, scratch=scratch)
+    return len(hits)
+
+
+def _match_tokens(text_lower: str, tokens: Set[str], words: Set[str], phrases, hits: Set[str]) -> None:
+    """Add to `hits` every keyword of (`words`, `phrases`) present in the text."""
+    hits.update(tokens & words)
+    for phrase_words, phrase, pattern in phrases:
+        if phrase not in hits and phrase_words <= tokens and pattern.search(text_lower):
+            hits.add(phrase)
 
 
 # ---------------------------------------------------------
-# 🔹 Scoring-based Regex Classifier
+# 🔹 Scoring-based Keyword Classifier
 # ---------------------------------------------------------
+def keyword_score(*texts: str) -> int:
+    """
+    Weighted keyword score: +2 per high-priority keyword, -3 per low-priority term.
+    Several texts (e.g. subject and body) are scored together without concatenating them.
+    """
+    # Each distinct keyword counts once, however often it appears
+    if HIGH_DB is not None:
+        buffers = [t.encode("utf-8", errors="ignore") for t in texts if t]
+        high_count = _count_hyperscan(HIGH_DB, buffers)
+        low_count = _count_hyperscan(LOW_DB, buffers)
+    else:
+        high_hits, low_hits = set(), set()
+        for t in texts:
+            if t:
+                # Lowercased and tokenized once per text, shared by both keyword lists
+                t_lower = t.lower()
+                tokens = set(TOKEN_RE.findall(t_lower))
+                _match_tokens(t_lower, tokens, HIGH_WORDS, HIGH_PHRASES, high_hits)
+                _match_tokens(t_lower, tokens, LOW_WORDS, LOW_PHRASES, low_hits)
+        high_count, low_count = len(high_hits), len(low_hits)
+
+    return 2 * high_count - 3 * low_count
+
+
 def is_high_priority(text: str) -> bool:
     """Weighted keyword scoring for improved accuracy."""
-    text_lower = text.lower()
-    score = 0
+    return keyword_score(text) >= THRESHOLD
 
-    for keyword in HIGH_PRIORITY_KEYWORDS:
-        if re.search(rf"\b{re.escape(keyword.lower())}\b", text_lower):
-            score += 2
 
-    for bad_word in LOW_PRIORITY_TERMS:
-        if re.search(rf"\b{re.escape(bad_word.lower())}\b", text_lower):
-            score -= 3
+def python_confidence(email: Dict[str, str]) -> Tuple[str, int]:
+    """
+    Keyword verdict for the cascade: ('High' | 'Low' | 'Unsure', score).
+    Only scores well clear of the threshold are trusted without the LLM.
+    """
+    score = keyword_score(email.get("subject", ""), email.get("body", ""))
+    if score >= THRESHOLD + 2:
+        return "High", score
+    if score <= -3:
+        return "Low", score
+    return "Unsure", score
+
 
-    return score >= THRESHOLD
+# ---------------------------------------------------------
+# 🔹 Bulk-mail pre-filter (no scoring, no LLM)
+# ---------------------------------------------------------
+BULK_SENDER_RE = re.compile(r"\b(?:no-?reply|do-?not-?reply|newsletters?|notifications?)@", re.I)
+SENDER_DOMAIN_RE = re.compile(r"@([\w.-]+)")
+
+
+def _is_bulk_domain(sender: str) -> bool:
+    """True if the sender's domain (or a parent domain) is in BULK_SENDER_DOMAINS."""
+    domains = SENDER_DOMAIN_RE.findall(sender)
+    if not domains:
+        return False
+    labels = domains[-1].lower().rstrip(".").split(".")
+    return any(".".join(labels[i:]) in BULK_SENDER_DOMAINS for i in range(len(labels) - 1))
+
+
+def pre_classify(email: Dict[str, str]) -> Optional[str]:
+    """
+    'Low Priority' for newsletters/notifications recognisable from headers alone, else None.
+    Automated senders with a high-priority subject (security alerts, payment failures ...)
+    are left to the classifier.
+    """
+    sender = email.get("from", "")
+    if not (email.get("list_unsubscribe") or BULK_SENDER_RE.search(sender) or _is_bulk_domain(sender)):
+        return None
+    if is_high_priority(email.get("subject", "")):
+        return None
+    return "Low Priority"
 
 
 def classify_email_python(email: Dict[str, str]) -> str:
     """Classify using keyword-based logic from JSON config."""
     subject = email.get("subject", "")
     body = email.get("body", "")
-    combined = f"{subject} {body}"
 
-    if is_high_priority(combined):
+    if keyword_score(subject, body) >= THRESHOLD:
         print(f"[PY-Classifier] ✅ High Priority: {subject}")
         return "High Priority"
     else:
@@ -70,6 +269,29 @@ def classify_email_python(email: Dict[str, str]) -> str:
 # ---------------------------------------------------------
 # 🔹 LLM-based classifier (via Azure OpenAI)
 # ---------------------------------------------------------
+def _label_from_response(response: str) -> Optional[str]:
+    """'High Priority' / 'Low Priority' from an LLM reply (its JSON "priority" field, else the raw text)."""
+    try:
+        text = str(json.loads(response).get("priority", ""))
+    except (ValueError, AttributeError):
+        text = response
+    text = text.lower()
+
+    if "high" in text:
+        return "High Priority"
+    if "low" in text:
+        return "Low Priority"
+    return None
+
+
+def _reason_from_response(response: str) -> Optional[str]:
+    """The model's "reason" field from a JSON reply, if any."""
+    try:
+        return json.loads(response).get("reason") or None
+    except (ValueError, AttributeError):
+        return None
+
+
 def classify_email_llm(email: Dict[str, str]) -> str:
     """
     Classify email using Azure OpenAI model.
@@ -77,24 +299,73 @@ def classify_email_llm(email: Dict[str, str]) -> str:
     """
     subject = email.get("subject", "")
     body = email.get("body", "")
-    prompt = EMAIL_CLASSIFIER_PROMPTS + f" Subject: {subject} \n" + f" Body: {body}\n"
+
+    cached = get_cached_label(email)
+    if cached:
+        print(f"[LLM-Classifier] 💾 Cached {cached}: {subject}")
+        return cached
+
+    llm_body = truncate_body(body)
 
     try:
-        label = classify_with_llm(prompt).strip().lower()
-        if "high" in label:
+        response = classify_with_llm(f"Subject: {subject}\nBody: {llm_body}", cache_text=f"{subject}\n{llm_body}")
+        label = _label_from_response(response)
+        if label == "High Priority":
             print(f"[LLM-Classifier] ✅ High Priority: {subject}")
+            store_label(email, "High Priority", _reason_from_response(response))
             return "High Priority"
-        elif "low" in label:
+        elif label == "Low Priority":
             print(f"[LLM-Classifier] Low Priority: {subject}")
+            if response != LLM_FALLBACK_RESPONSE:
+                store_label(email, "Low Priority", _reason_from_response(response))
             return "Low Priority"
         else:
-            print(f"[LLM-Classifier] ⚠️ Unexpected response → {label}. Falling back to Python.")
+            print(f"[LLM-Classifier] ⚠️ Unexpected response → {response.strip()}. Falling back to Python.")
             return classify_email_python(email)
     except Exception as e:
         print(f"[LLM-Classifier] ❌ Error: {e}. Falling back to Python classifier.")
         return classify_email_python(email)
 
 
+def classify_emails_llm_batched(emails: List[Dict[str, str]]) -> None:
+    """
+    Set e["priority"] for each email via the LLM, LLM_BATCH_SIZE emails per call.
+    Cached labels are reused; emails the model skips go through classify_email_llm.
+    """
+    cached_labels = get_cached_labels(emails)
+    misses = []
+    for e, cached in zip(emails, cached_labels):
+        if cached:
+            e["priority"] = cached
+            print(f"[LLM-Classifier] 💾 Cached {cached}: {e.get('subject', '')}")
+        else:
+            misses.append(e)
+
+    pending = iter(misses)
+    while chunk := list(islice(pending, LLM_BATCH_SIZE)):
+        contents = [(e.get("subject", ""), truncate_body(e.get("body", ""))) for e in chunk]
+        items = [f"Subject: {subject}\nBody: {body}" for subject, body in contents]
+        cache_texts = [f"{subject}\n{body}" for subject, body in contents]
+
+        print(f"[LLM-Classifier] 📦 Classifying {len(chunk)} email(s) in one request...")
+        responses = classify_with_llm_batch(items, cache_texts)
+
+        fresh = []
+        for e, response in zip(chunk, responses):
+            subject = e.get("subject", "")
+            label = _label_from_response(response) if response is not None else None
+            if label is None:
+                # Skipped or unreadable in the batch reply: classify on its own
+                e["priority"] = classify_email_llm(e)
+                continue
+
+            e["priority"] = label
+            print(f"[LLM-Classifier] {'✅ ' if label == 'High Priority' else ''}{label}: {subject}")
+            if response != LLM_FALLBACK_RESPONSE:
+                fresh.append((e, label, _reason_from_response(response)))
+        store_labels(fresh)
+
+
 # ---------------------------------------------------------
 # 🔹 Unified bulk classification
 # ---------------------------------------------------------
@@ -103,14 +374,28 @@ def classify_emails_bulk(emails: List[Dict[str, str]]) -> List[Dict[str, str]]:
     mode = CLASSIFICATION_MODE.lower()
     print(f"\n[Classifier] 🧠 Using mode: {mode.upper()}")
     classified = []
+    for_llm = []
 
     for e in emails:
-        if mode == "llm":
-            e["priority"] = classify_email_llm(e)
+        label = pre_classify(e) if PRE_CLASSIFY_ENABLED else None
+        if label:
+            e["priority"] = label
+            print(f"[Pre-Filter] 📭 {label} (bulk sender), not classified: {e.get('subject', '')}")
+        elif mode == "llm":
+            confidence, score = python_confidence(e) if CASCADE_ENABLED else ("Unsure", 0)
+            if confidence == "Unsure":
+                for_llm.append(e)
+            else:
+                e["priority"] = f"{confidence} Priority"
+                print(f"[Cascade] ⚡ {e['priority']} (score {score}), LLM skipped: {e.get('subject', '')}")
         else:
             e["priority"] = classify_email_python(e)
         classified.append(e)
 
+    # Ambiguous emails go to the LLM together, a chunk per request
+    if for_llm:
+        classify_emails_llm_batched(for_llm)
+
     print(f"[Classifier] ✅ Completed classification for {len(classified)} emails.\n")
     return classified
 
@@ -6,6 +6,15 @@ from dotenv import load_dotenv
 load_dotenv()
 
 CLASSIFICATION_MODE = "llm" # llm
+# In llm mode, let the keyword scorer settle clear-cut emails and only send ambiguous ones to the LLM
+CASCADE_ENABLED = os.getenv("CASCADE_ENABLED", "true").lower() == "true"
+# Mark obvious bulk mail (List-Unsubscribe header, noreply@/newsletter@ senders, bulk domains) Low without classifying it
+PRE_CLASSIFY_ENABLED = os.getenv("PRE_CLASSIFY_ENABLED", "true").lower() == "true"
+BULK_SENDER_DOMAINS = frozenset(
+    d.strip().lower()
+    for d in os.getenv("BULK_SENDER_DOMAINS", "substack.com,mailchimpapp.com,beehiiv.com,medium.com").split(",")
+    if d.strip()
+)
 
 
 # Gmail / Google Cloud API
@@ -23,14 +32,27 @@ TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_WHATSAPP_FROM = os.getenv("TWILIO_WHATSAPP_FROM")
 TWILIO_WHATSAPP_TO = os.getenv("TWILIO_WHATSAPP_TO")
 BITLY_ACCESS_TOKEN = os.getenv("BITLY_ACCESS_TOKEN")
+NOTIFY_MAX_CONCURRENCY = int(os.getenv("NOTIFY_MAX_CONCURRENCY", 5))  # in-flight Twilio sends (account rate limit)
 
 # LLM / Model
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 MODEL_NAME = os.getenv("MODEL_NAME", "gpt-4o-mini")
 MODEL_PROVIDER = os.getenv("MODEL_PROVIDER", "openai")
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", 20))  # emails packed into one chat completion
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))  # in-flight LLM requests
+USE_BATCH_API = os.getenv("USE_BATCH_API", "false").lower() == "true"  # offline backfills via the Batch API
+MAX_BODY_CHARS = int(os.getenv("MAX_BODY_CHARS", 1200))  # body characters sent to the LLM per email
+BODY_PREVIEW_CHARS = int(os.getenv("BODY_PREVIEW_CHARS", 600))  # "body_preview" (the alert snippet), cut once at fetch time
+
+# Semantic cache: reuse the label of a near-identical, already classified email
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.95))  # min cosine similarity for a hit
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
 
 # Scheduler / System Config
 TIMEZONE = os.getenv("TIMEZONE", "Asia/Kolkata")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()  # pipeline / notifier log level
+READER_LOG_LEVEL = os.getenv("READER_LOG_LEVEL", "WARNING").upper()  # email_reader logger level
 BATCH_SEND_HOUR = int(os.getenv("BATCH_SEND_HOUR", 20))
 WEEKLY_SEND_DAY = os.getenv("WEEKLY_SEND_DAY", "Sunday")
 
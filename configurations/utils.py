@@ -106,7 +106,8 @@ def save_to_cache(data, category, key):
     # Only cache essential items
     essential_items = {
         'embedding': ['model', 'index'],
-        'summarization': ['model']
+        'summarization': ['model'],
+        'classifier': ['rules']
     }
 
     if category in essential_items and key in essential_items[category]:
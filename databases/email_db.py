@@ -1,5 +1,6 @@
 import sqlite3
-from typing import List, Dict, Any
+import threading
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 import os
 
@@ -7,14 +8,30 @@ from email_ops.email_reader import read_read_emails
 
 DB_PATH = "emails_info.db"
 
+# One connection per thread, opened lazily and kept for the process lifetime
+_local = threading.local()
 
-def init_db():
+
+def get_connection() -> sqlite3.Connection:
+    """Return this thread's shared SQLite connection, opening it on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH)
+        conn.execute("PRAGMA synchronous=NORMAL")  # safe with WAL, fewer fsyncs per commit
+        _local.conn = conn
+    return conn
+
+
+def init_db(conn: Optional[sqlite3.Connection] = None):
     """Initialize SQLite database and create table if not exists."""
     print("[DB] Initializing database...")
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = conn or get_connection()
     cursor = conn.cursor()
 
+    # WAL is persisted in the DB file: readers no longer block the writer
+    cursor.execute("PRAGMA journal_mode=WAL")
+
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS emails (
             id TEXT PRIMARY KEY,
@@ -26,70 +43,95 @@ def init_db():
             priority TEXT DEFAULT 'Unclassified'
         )
     """)
+    # fetch_all_emails orders by timestamp; lookups by id already use the PRIMARY KEY index
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_emails_timestamp ON emails(timestamp)")
     conn.commit()
-    conn.close()
     print("[DB] ✅ Table 'emails' (with 'priority' column) ready.\n")
 
 
-def email_exists(email_id: str) -> bool:
+def email_exists(email_id: str, conn: Optional[sqlite3.Connection] = None) -> bool:
     """Check if an email already exists in the DB by ID."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT 1 FROM emails WHERE id = ?", (email_id,))
-    exists = cursor.fetchone() is not None
-    conn.close()
-    return exists
+    conn = conn or get_connection()
+    cursor = conn.execute("SELECT 1 FROM emails WHERE id = ?", (email_id,))
+    return cursor.fetchone() is not None
 
 
-def insert_emails(emails: List[Dict[str, Any]]):
-    """Insert only new email records into the database."""
+def insert_emails(emails: List[Dict[str, Any]], conn: Optional[sqlite3.Connection] = None):
+    """
+    Insert only new email records into the database.
+    `body` is stored NULL when it was never downloaded (bulk mail labelled from headers alone).
+    """
     if not emails:
         print("[DB] ⚠️ No new emails to insert.")
         return
 
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    new_count, skipped_count = 0, 0
+    conn = conn or get_connection()
+    new_count = 0
 
     print(f"[DB] 📨 Starting insertion of {len(emails)} email(s)...")
 
-    for email in emails:
-        email_id = email.get("id")
-        if email_exists(email_id):
-            print(f"[DB] ⏩ Skipping duplicate email ID: {email_id}")
-            skipped_count += 1
-            continue
-
-        try:
-            cursor.execute("""
-                INSERT INTO emails (id, sender, subject, body, date, timestamp, priority)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                email_id,
-                email.get("from"),
-                email.get("subject"),
-                email.get("body"),
-                email.get("date"),
-                email.get("timestamp", datetime.now().isoformat()),
-                email.get("priority", "Unclassified")
-            ))
-            new_count += 1
-            print(f"[DB] ✅ Inserted email ID: {email_id}")
-        except Exception as e:
-            print(f"[DB] ⚠️ Error inserting email ID {email_id}: {e}")
+    now = datetime.now().isoformat()
+    ids = [email.get("id") for email in emails]
+
+    try:
+        # Single transaction. Overlapping scheduled windows re-fetch mostly known emails:
+        # one IN (...) lookup finds them, so only new rows are built and inserted
+        with conn:
+            existing = {
+                row[0] for row in conn.execute(
+                    f"SELECT id FROM emails WHERE id IN ({','.join('?' * len(ids))})", ids
+                )
+            }
+            rows = [
+                (
+                    email.get("id"),
+                    email.get("from"),
+                    email.get("subject"),
+                    email.get("body"),
+                    email.get("date"),
+                    email.get("timestamp", now),
+                    email.get("priority", "Unclassified"),
+                )
+                for email in emails
+                if email.get("id") not in existing
+            ]
+            if rows:
+                # OR IGNORE still covers an ID repeated within this batch
+                cursor = conn.executemany("""
+                    INSERT OR IGNORE INTO emails (id, sender, subject, body, date, timestamp, priority)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, rows)
+                new_count = cursor.rowcount
+    except Exception as e:
+        print(f"[DB] ⚠️ Error inserting emails, batch rolled back: {e}")
+        return
 
-    conn.commit()
-    conn.close()
+    skipped_count = len(emails) - new_count
     print(f"\n[DB] ✅ Summary: {new_count} new email(s) inserted, {skipped_count} duplicate(s) skipped.\n")
 
 
-def fetch_all_emails(limit: int = 10):
+def update_priorities(priorities: Dict[str, str], conn: Optional[sqlite3.Connection] = None) -> int:
+    """Apply {email_id: priority} labels to already-stored emails (e.g. Batch API results)."""
+    if not priorities:
+        return 0
+
+    conn = conn or get_connection()
+    with conn:
+        cursor = conn.executemany(
+            "UPDATE emails SET priority = ? WHERE id = ?",
+            [(priority, email_id) for email_id, priority in priorities.items()],
+        )
+        updated = cursor.rowcount
+
+    print(f"[DB] 🏷️ Updated priority for {updated} email(s).")
+    return updated
+
+
+def fetch_all_emails(limit: int = 10, conn: Optional[sqlite3.Connection] = None):
     """Fetch and display recent emails from the database."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, sender, subject, date, priority FROM emails ORDER BY timestamp DESC LIMIT ?", (limit,))
+    conn = conn or get_connection()
+    cursor = conn.execute("SELECT id, sender, subject, date, priority FROM emails ORDER BY timestamp DESC LIMIT ?", (limit,))
     rows = cursor.fetchall()
-    conn.close()
 
     print(f"[DB] 📬 Retrieved {len(rows)} stored email(s):\n")
     for row in rows:
@@ -3,15 +3,78 @@ bitly_utils.py — URL Shortening via Bitly API
 ----------------------------------------------
 Safely shortens Gmail URLs before sending them via WhatsApp notifications.
 If Bitly is unavailable or the token is missing, the system falls back to the original link.
+Shortened links are remembered on disk, so recurring subjects cost one API call ever.
 """
 
+import asyncio
+import logging
 import os
+import shelve
+import threading
+from typing import Dict, List, Optional
+
+import httpx
+import orjson
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from configurations.utils import ensure_cache_dir
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 BITLY_ACCESS_TOKEN = os.getenv("BITLY_ACCESS_TOKEN")
+BITLY_API_BASE = "https://api-ssl.bitly.com"
+BITLY_SHORTEN_PATH = "/v4/shorten"
+BITLY_MAX_WORKERS = 8  # shorten requests in flight at once
+
+# long_url -> short link, persisted across runs; shelve is not thread-safe, hence the lock
+_links_lock = threading.Lock()
+
+# Keep-alive pool shared by all calls; transient 429/5xx are retried with backoff.
+# POST is safe to retry here: Bitly returns the same link for the same long_url.
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset({"POST"}),
+    ),
+))
+
+
+def _links_path() -> str:
+    # Resolved on first use, so importing this module doesn't create the cache dir
+    return os.path.join(ensure_cache_dir(), "bitly_links")
+
+
+def _get_saved_links(long_urls: List[str]) -> Dict[str, str]:
+    """Saved short links for whichever of `long_urls` have one, in one shelve open."""
+    with _links_lock, shelve.open(_links_path()) as links:
+        return {url: links[url] for url in long_urls if url in links}
+
+
+def _save_links(short_links: Dict[str, str]) -> None:
+    if not short_links:
+        return
+    with _links_lock, shelve.open(_links_path()) as links:
+        links.update(short_links)
+
+
+def _read_link(data: dict) -> Optional[str]:
+    """Short link from a /v4/shorten reply, or None (caller falls back to the long URL)."""
+    short_url = data.get("link")
+    if short_url:
+        logger.info("✅ Shortened URL: %s", short_url)
+    else:
+        logger.warning("⚠️ Bitly returned no link field. Using full URL instead.")
+    return short_url
 
 
 def shorten_url(long_url: str) -> str:
@@ -20,27 +83,79 @@ def shorten_url(long_url: str) -> str:
     Falls back to original URL if Bitly is not configured or fails.
     """
     if not BITLY_ACCESS_TOKEN:
-        print("[Bitly] ⚠️ No Bitly access token found. Using full Gmail link instead.")
+        logger.warning("⚠️ No Bitly access token found. Using full Gmail link instead.")
         return long_url
 
-    bitly_api = "https://api-ssl.bitly.com/v4/shorten"
+    saved = _get_saved_links([long_url]).get(long_url)
+    if saved:
+        logger.info("♻️ Reusing shortened URL: %s", saved)
+        return saved
+
     headers = {"Authorization": f"Bearer {BITLY_ACCESS_TOKEN}"}
     payload = {"long_url": long_url}
 
     try:
-        print(f"[Bitly] 🔗 Shortening URL: {long_url}")
-        response = requests.post(bitly_api, json=payload, headers=headers, timeout=8)
+        logger.info("🔗 Shortening URL: %s", long_url)
+        response = _session.post(BITLY_API_BASE + BITLY_SHORTEN_PATH, json=payload, headers=headers, timeout=8)
         response.raise_for_status()
-        data = response.json()
-        short_url = data.get("link")
-
-        if short_url:
-            print(f"[Bitly] ✅ Shortened URL: {short_url}")
-            return short_url
-        else:
-            print("[Bitly] ⚠️ API returned no link field. Using full URL instead.")
-            return long_url
+        short_url = _read_link(response.json())
 
     except requests.exceptions.RequestException as e:
-        print(f"[Bitly] ❌ Failed to shorten URL ({e}). Using full Gmail link instead.")
+        logger.error("❌ Failed to shorten URL (%s). Using full Gmail link instead.", e)
+        return long_url
+
+    if not short_url:
         return long_url
+    _save_links({long_url: short_url})
+    return short_url
+
+
+async def shorten_urls_async(urls: List[str]) -> List[str]:
+    """
+    Shorten several URLs concurrently, preserving input order: one HTTP/2 client
+    multiplexes the calls over a single connection, at most BITLY_MAX_WORKERS in flight.
+    Each entry falls back to its original URL on failure, as in shorten_url.
+    """
+    if not BITLY_ACCESS_TOKEN:  # Bitly disabled (e.g. CI): no connection either
+        logger.warning("⚠️ No Bitly access token found. Using full Gmail links instead.")
+        return list(urls)
+
+    # The on-disk memo is read once before the requests and written once after, on a
+    # worker thread: shelve I/O and its lock would otherwise block the event loop per URL
+    saved = await asyncio.to_thread(_get_saved_links, urls)
+    if saved:
+        logger.info("♻️ Reusing %d shortened URL(s).", len(saved))
+    todo = [url for url in dict.fromkeys(urls) if url not in saved]
+    if not todo:
+        return [saved[url] for url in urls]
+
+    semaphore = asyncio.Semaphore(BITLY_MAX_WORKERS)
+
+    async def shorten(client: httpx.AsyncClient, long_url: str) -> Optional[str]:
+        async with semaphore:
+            try:
+                logger.info("🔗 Shortening URL: %s", long_url)
+                response = await client.post(BITLY_SHORTEN_PATH, json={"long_url": long_url})
+                response.raise_for_status()
+                return _read_link(orjson.loads(response.content))
+            except (httpx.HTTPError, orjson.JSONDecodeError) as e:
+                logger.error("❌ Failed to shorten URL (%s). Using full Gmail link instead.", e)
+                return None
+
+    # One client per call: an AsyncClient is tied to the event loop it first ran on.
+    # http2/limits must sit on the transport: the client ignores them when one is passed.
+    async with httpx.AsyncClient(
+        base_url=BITLY_API_BASE,
+        headers={"Authorization": f"Bearer {BITLY_ACCESS_TOKEN}"},
+        timeout=httpx.Timeout(5.0, connect=2.0),
+        transport=httpx.AsyncHTTPTransport(
+            http2=True,
+            retries=2,
+            limits=httpx.Limits(max_connections=BITLY_MAX_WORKERS, max_keepalive_connections=4),
+        ),
+    ) as client:
+        links = await asyncio.gather(*(shorten(client, url) for url in todo))
+
+    shortened = {url: link for url, link in zip(todo, links) if link}
+    await asyncio.to_thread(_save_links, shortened)
+    return [saved.get(url) or shortened.get(url) or url for url in urls]
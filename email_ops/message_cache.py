@@ -0,0 +1,84 @@
+"""
+message_cache.py — Persistent cache of parsed Gmail messages
+-------------------------------------------------------------
+Gmail message IDs are stable and a message's content never changes, so the
+rolling-window runs (every few hours, overlapping windows) keep re-fetching
+messages they have already parsed. Parsed email dicts are stored in SQLite
+keyed by message ID, and only IDs missing from the cache are requested from
+the API. Entries expire after MESSAGE_CACHE_TTL_DAYS.
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+MESSAGE_CACHE_DB_PATH = "message_cache.db"
+MESSAGE_CACHE_TTL_DAYS = 30
+# Bump when the parsed email dict changes shape: older entries are dropped once
+MESSAGE_CACHE_VERSION = 3  # 2: "body_preview" cut at BODY_PREVIEW_CHARS; 3: "body_truncated"
+
+# One connection per thread, opened lazily and reused
+_local = threading.local()
+
+
+def _connect() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(MESSAGE_CACHE_DB_PATH)
+        if conn.execute("PRAGMA user_version").fetchone()[0] != MESSAGE_CACHE_VERSION:
+            _migrate(conn)
+        _local.conn = conn
+    return conn
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    """(Re)create the messages table for MESSAGE_CACHE_VERSION, once per database file."""
+    # Write lock first, then re-check: threads opening their first connection
+    # together migrate one at a time, and the later ones find nothing to do
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("PRAGMA user_version").fetchone()[0] != MESSAGE_CACHE_VERSION:
+            conn.execute("DROP TABLE IF EXISTS messages")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    id TEXT PRIMARY KEY,
+                    email TEXT NOT NULL,
+                    cached_at TEXT
+                )
+            """)
+            conn.execute(f"PRAGMA user_version = {MESSAGE_CACHE_VERSION}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def get_cached_messages(msg_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """{msg_id: parsed email} for every ID cached within the TTL."""
+    if not msg_ids:
+        return {}
+
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=MESSAGE_CACHE_TTL_DAYS)).isoformat()
+    conn = _connect()
+    rows = conn.execute(
+        f"SELECT id, email FROM messages WHERE id IN ({','.join('?' * len(msg_ids))}) AND cached_at >= ?",
+        [*msg_ids, cutoff],
+    ).fetchall()
+
+    return {msg_id: json.loads(email) for msg_id, email in rows}
+
+
+def store_messages(emails: List[Dict[str, Any]]) -> None:
+    """Persist fully parsed emails (with bodies) by message ID."""
+    if not emails:
+        return
+
+    now = datetime.now(timezone.utc).isoformat()  # aware UTC, like the emails' own timestamps
+    conn = _connect()
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO messages (id, email, cached_at) VALUES (?, ?, ?)",
+            [(e["id"], json.dumps(e), now) for e in emails],
+        )
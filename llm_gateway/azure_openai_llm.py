@@ -1,26 +1,128 @@
+import json
+from functools import lru_cache
+from typing import List, Optional
+
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_openai import ChatOpenAI
 
-from configurations.config import MODEL_NAME, OPENAI_API_KEY
+from configurations.config import MODEL_NAME, OPENAI_API_KEY, SEMANTIC_CACHE_ENABLED
+from llm_gateway import semantic_cache
+from prompts.email_agent_prompts import (
+    EMAIL_BATCH_CLASSIFIER_PROMPTS,
+    EMAIL_BATCH_CLASSIFIER_SCHEMA,
+    EMAIL_CLASSIFIER_SCHEMA,
+    EMAIL_CLASSIFIER_SYSTEM,
+)
+
+# Returned when the LLM call itself fails; callers must not cache it
+LLM_FALLBACK_RESPONSE = '{"priority": "Low Priority", "reason": "LLM error - fallback applied."}'
+
+CLASSIFIER_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "priority", "schema": EMAIL_CLASSIFIER_SCHEMA, "strict": True},
+}
+BATCH_CLASSIFIER_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "priorities", "schema": EMAIL_BATCH_CLASSIFIER_SCHEMA, "strict": True},
+}
+
+
+# System messages built once and shared by reference; each call only allocates its user message
+_CLASSIFIER_SYSTEM_MESSAGE = SystemMessage(content=EMAIL_CLASSIFIER_SYSTEM)
+_BATCH_CLASSIFIER_SYSTEM_MESSAGE = SystemMessage(content=EMAIL_BATCH_CLASSIFIER_PROMPTS)
+
 
+def build_classifier_messages(email_text: str) -> list:
+    """[shared system prompt, user message] for classifying one email."""
+    return [_CLASSIFIER_SYSTEM_MESSAGE, HumanMessage(content=email_text)]
 
-def classify_with_llm(prompt: str) -> str:
-    """Classify an email using OpenAI via LangChain (latest)."""
 
-    llm = ChatOpenAI(
+@lru_cache(maxsize=1)
+def _get_llm() -> ChatOpenAI:
+    """One ChatOpenAI (and its HTTP connection pool) per process, built on first use."""
+    return ChatOpenAI(
         model=MODEL_NAME,
         temperature=0,
         api_key=OPENAI_API_KEY,
     )
 
-    messages = [
-        SystemMessage(content="You are an email priority classifier."),
-        HumanMessage(content=prompt),
-    ]
+
+@lru_cache(maxsize=2)
+def _get_classifier_llm(batch: bool = False):
+    """The shared ChatOpenAI bound to the (single or batch) structured-output format, bound once."""
+    return _get_llm().bind(
+        response_format=BATCH_CLASSIFIER_RESPONSE_FORMAT if batch else CLASSIFIER_RESPONSE_FORMAT
+    )
+
+
+def warm_up() -> None:
+    """Build the shared ChatOpenAI client ahead of the first classification."""
+    _get_llm()
+
+
+def classify_with_llm(email_text: str, cache_text: Optional[str] = None) -> str:
+    """
+    Classify one email ("Subject/Body" text) using OpenAI via LangChain (latest).
+    The instructions travel as a fixed system prompt and the reply is a schema-checked
+    {"priority", "reason"} JSON string.
+    `cache_text` (the email content, without the instructions) enables the semantic cache.
+    """
+    use_cache = SEMANTIC_CACHE_ENABLED and bool(cache_text)
+    vector = None
+    if use_cache:
+        cached, vector = semantic_cache.lookup(cache_text)
+        if cached is not None:
+            return cached
+
+    llm = _get_classifier_llm()
+    messages = build_classifier_messages(email_text)
 
     try:
         response = llm.invoke(messages)
+        if use_cache:
+            semantic_cache.store(cache_text, response.content, vector)
         return response.content
     except Exception as e:
         print(f"[LLM] ❌ Classification failed: {e}")
-        return '{"priority": "Low Priority", "reason": "LLM error - fallback applied."}'
+        return LLM_FALLBACK_RESPONSE
+
+
+def classify_with_llm_batch(items: List[str], cache_texts: Optional[List[str]] = None) -> List[Optional[str]]:
+    """
+    Classify several emails (one "Subject/Body" text each) with a single LLM call.
+    Returns one {"priority", "reason"} JSON string per item, in order; None where the
+    model skipped an item. If the call itself fails, every item gets LLM_FALLBACK_RESPONSE.
+    """
+    results: List[Optional[str]] = [None] * len(items)
+    vectors = [None] * len(items)
+
+    use_cache = SEMANTIC_CACHE_ENABLED and cache_texts is not None
+    if use_cache:
+        results, vectors = semantic_cache.lookup_many(cache_texts)
+
+    pending = [i for i, r in enumerate(results) if r is None]
+    if not pending:
+        return results
+
+    content = "\n\n".join(f"Email {n}:\n{items[i]}" for n, i in enumerate(pending, start=1))
+    messages = [_BATCH_CLASSIFIER_SYSTEM_MESSAGE, HumanMessage(content=content)]
+
+    try:
+        # Strict schema: the reply is always a parseable {"results": [...]} array
+        response = _get_classifier_llm(batch=True).invoke(messages)
+        answers = json.loads(response.content).get("results", [])
+    except Exception as e:
+        print(f"[LLM] ❌ Batch classification failed: {e}")
+        for i in pending:
+            results[i] = LLM_FALLBACK_RESPONSE
+        return results
+
+    for answer in answers:
+        n = answer.get("index") if isinstance(answer, dict) else None
+        if isinstance(n, int) and 1 <= n <= len(pending):
+            i = pending[n - 1]
+            results[i] = json.dumps({"priority": answer.get("priority", ""), "reason": answer.get("reason", "")})
+            if use_cache:
+                semantic_cache.store(cache_texts[i], results[i], vectors[i])
+
+    return results
@@ -0,0 +1,199 @@
+"""
+semantic_cache.py — Embedding-similarity cache for LLM classifications
+-----------------------------------------------------------------------
+Newsletter blasts and notification templates differ only in a name, a date
+or a tracking link, so the exact-match label cache misses them while the
+LLM would answer identically. Before a classification call, the email text
+is looked up by exact hash, then by cosine similarity of its embedding
+against previously classified emails; a match at or above
+SEMANTIC_CACHE_THRESHOLD reuses the stored LLM response.
+
+Embeddings are requested with 256 dimensions (text-embedding-3 models allow
+shortening), stored unit-normalized as float32 blobs in SQLite, and scanned
+in memory — a dot product per cached email, no vector index dependency. The
+scan is pure Python before 3.12, so it is capped at SEMANTIC_CACHE_MAX_ENTRIES
+(about 9 ms per lookup on CI's Python 3.10; 5000 entries took about 60 ms).
+"""
+
+import hashlib
+import math
+import operator
+import sqlite3
+import threading
+from array import array
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from langchain_openai import OpenAIEmbeddings
+
+from configurations.config import EMBEDDING_MODEL, OPENAI_API_KEY, SEMANTIC_CACHE_THRESHOLD
+
+SEMANTIC_CACHE_DB_PATH = "semantic_cache.db"
+SEMANTIC_CACHE_MAX_ENTRIES = 1000  # most recent entries scanned per lookup (scan cost is linear)
+EMBEDDING_DIMENSIONS = 256
+
+# One connection per thread, opened lazily and reused
+_local = threading.local()
+
+# In-memory copy of the stored (unit vector, response) pairs, newest last
+# Vectors are held as float lists: the dot product reads them ~25% faster than arrays
+_index: Optional[List[Tuple[List[float], str]]] = None
+_index_lock = threading.Lock()
+
+
+def _dot(a: List[float], b: List[float]) -> float:
+    return sum(map(operator.mul, a, b))
+
+
+if hasattr(math, "sumprod"):  # Python 3.12+: C loop, ~3x faster
+    _dot = math.sumprod
+
+
+def _connect() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(SEMANTIC_CACHE_DB_PATH)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS semantic_cache (
+                key TEXT PRIMARY KEY,
+                embedding BLOB,
+                response TEXT NOT NULL,
+                created_at TEXT
+            )
+        """)
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+
+def _text_key(text: str) -> str:
+    """Hash of the case- and whitespace-normalized text."""
+    normalized = " ".join(text.lower().split())
+    return hashlib.blake2b(normalized.encode("utf-8", errors="ignore"), digest_size=16).hexdigest()
+
+
+@lru_cache(maxsize=1)
+def _get_embedder() -> OpenAIEmbeddings:
+    return OpenAIEmbeddings(model=EMBEDDING_MODEL, dimensions=EMBEDDING_DIMENSIONS, api_key=OPENAI_API_KEY)
+
+
+def _normalize(vector: List[float]) -> array:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return array("f", (x / norm for x in vector))
+
+
+def _embed(text: str) -> array:
+    return _normalize(_get_embedder().embed_query(text))
+
+
+def _get_index() -> List[Tuple[List[float], str]]:
+    global _index
+
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                rows = _connect().execute(
+                    "SELECT embedding, response FROM semantic_cache WHERE embedding IS NOT NULL "
+                    "ORDER BY created_at DESC LIMIT ?",
+                    (SEMANTIC_CACHE_MAX_ENTRIES,),
+                ).fetchall()
+                index = []
+                for blob, response in reversed(rows):
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    index.append((vector.tolist(), response))
+                _index = index
+    return _index
+
+
+def lookup(text: str) -> Tuple[Optional[str], Optional[array]]:
+    """
+    Cached LLM response for `text` (exact, then semantic), or None.
+    Also returns the embedding computed on the way, so store() needn't embed twice.
+    """
+    row = _connect().execute(
+        "SELECT response FROM semantic_cache WHERE key = ?", (_text_key(text),)
+    ).fetchone()
+    if row:
+        print("[SemanticCache] 💾 Exact hit.")
+        return row[0], None
+
+    try:
+        vector = _embed(text)
+    except Exception as e:
+        print(f"[SemanticCache] ⚠️ Embedding failed ({e}). Skipping cache.")
+        return None, None
+
+    return _nearest(vector), vector
+
+
+def lookup_many(texts: List[str]) -> Tuple[List[Optional[str]], List[Optional[array]]]:
+    """
+    lookup() for several texts: one query for the exact hits, then a single
+    embedding request for the rest before the similarity scan.
+    """
+    responses: List[Optional[str]] = [None] * len(texts)
+    vectors: List[Optional[array]] = [None] * len(texts)
+    if not texts:
+        return responses, vectors
+
+    keys = [_text_key(text) for text in texts]
+    placeholders = ",".join("?" * len(set(keys)))
+    exact = dict(_connect().execute(
+        f"SELECT key, response FROM semantic_cache WHERE key IN ({placeholders})", list(set(keys))
+    ).fetchall())
+
+    misses = []
+    for i, key in enumerate(keys):
+        if key in exact:
+            print("[SemanticCache] 💾 Exact hit.")
+            responses[i] = exact[key]
+        else:
+            misses.append(i)
+    if not misses:
+        return responses, vectors
+
+    try:
+        embeddings = _get_embedder().embed_documents([texts[i] for i in misses])
+    except Exception as e:
+        print(f"[SemanticCache] ⚠️ Embedding failed ({e}). Skipping cache.")
+        return responses, vectors
+
+    for i, embedding in zip(misses, embeddings):
+        vectors[i] = _normalize(embedding)
+        responses[i] = _nearest(vectors[i])
+    return responses, vectors
+
+
+def _nearest(vector: array) -> Optional[str]:
+    """Response of the most similar cached email, if it clears the threshold."""
+    query = vector.tolist()
+    best_score, best_response = 0.0, None
+    for other, response in _get_index():
+        score = _dot(query, other)
+        if score > best_score:
+            best_score, best_response = score, response
+
+    if best_response is not None and best_score >= SEMANTIC_CACHE_THRESHOLD:
+        print(f"[SemanticCache] ♻️ Semantic hit (cosine {best_score:.3f}).")
+        return best_response
+    return None
+
+
+def store(text: str, response: str, vector: Optional[array] = None) -> None:
+    """Remember the LLM response for `text` (and its embedding, when one was computed)."""
+    blob = vector.tobytes() if vector is not None else None
+    conn = _connect()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO semantic_cache (key, embedding, response, created_at) VALUES (?, ?, ?, ?)",
+            (_text_key(text), blob, response, datetime.now().isoformat()),
+        )
+
+    if vector is not None:
+        index = _get_index()
+        with _index_lock:
+            index.append((vector.tolist(), response))
+            if len(index) > SEMANTIC_CACHE_MAX_ENTRIES:
+                del index[0]
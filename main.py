@@ -1,21 +1,99 @@
-from datetime import datetime, timedelta
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from operator import itemgetter
 
 from fastapi import HTTPException
 
-from classifier.smart_email_classifier import classify_emails_bulk
+from classifier.smart_email_classifier import classify_emails_bulk, pre_classify
+from configurations.config import LLM_BATCH_SIZE, LOG_LEVEL, NOTIFY_MAX_CONCURRENCY, PRE_CLASSIFY_ENABLED
 from databases.email_db import init_db, insert_emails
-from email_ops.email_reader import read_read_emails, read_unread_emails
+from email_ops.email_reader import hydrate_bodies, read_read_emails, read_unread_emails
+from llm_gateway.azure_openai_llm import warm_up as warm_up_llm
+from notifiers.whatsapp_notifiers import warm_up as warm_up_notifier
 from notifiers.whatsapp_notifiers import (
+    RECEIVED_TIME_FORMAT,
+    SANDBOX_EXPIRED_CODE,
+    reset_sandbox_expiry,
+    sandbox_expired,
     send_whatsapp_message,
-    send_sandbox_expiry_notification,
+    shorten_many,
 )
 
+# Configured once per process; force=True replaces the bare INFO config that
+# configurations.utils installs on import. Records go through logging instead of
+# one unbuffered stdout write per print.
+logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s | %(message)s", force=True)
+log = logging.getLogger("pipeline")
+
 # =========================================================
 # Init DB once (important for GitHub Actions / cron runs)
 # =========================================================
 init_db()
 
 
+def _warm_clients() -> None:
+    """Build the LLM and Twilio clients while the Gmail fetch is in flight."""
+    for warm_up in (warm_up_llm, warm_up_notifier):
+        try:
+            warm_up()
+        except Exception as e:  # the real call reports it again, in context
+            log.warning("Client warm-up failed: %s", e)
+
+
+# send_whatsapp_message kwargs, read from each email in one itemgetter call
+# (the reader always sets these keys)
+ALERT_FIELDS = ("subject", "sender", "priority", "snippet", "received_time", "snippet_truncated")
+_alert_values = itemgetter("subject", "from", "priority", "body_preview", "date", "body_truncated")
+
+# Emails per classify -> store hand-off; one LLM batch, so batching isn't split up
+PIPELINE_BATCH_SIZE = LLM_BATCH_SIZE
+
+
+async def classify_and_store(emails):
+    """
+    Classify and store in sub-batches on worker threads, connected by a queue:
+    storing batch k-1 overlaps classifying batch k. Returns the classified emails in order.
+    """
+    insert_q = asyncio.Queue(maxsize=2)
+    classified = []
+
+    async def classifier():
+        for i in range(0, len(emails), PIPELINE_BATCH_SIZE):
+            batch = await asyncio.to_thread(classify_emails_bulk, emails[i:i + PIPELINE_BATCH_SIZE])
+            classified.extend(batch)
+            await insert_q.put(batch)
+        await insert_q.put(None)  # end of stream
+
+    async def inserter():
+        while (batch := await insert_q.get()) is not None:
+            await asyncio.to_thread(insert_emails, batch)
+
+    tasks = [asyncio.create_task(classifier()), asyncio.create_task(inserter())]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # Either side failing would leave the other blocked on the queue
+        for task in tasks:
+            task.cancel()
+        raise
+    return classified
+
+
+async def send_alerts(payloads):
+    """
+    Send WhatsApp alerts concurrently (blocking Twilio calls on worker threads),
+    at most NOTIFY_MAX_CONCURRENCY in flight. Returns one result or exception per payload.
+    """
+    semaphore = asyncio.Semaphore(NOTIFY_MAX_CONCURRENCY)
+
+    async def send(kwargs):
+        async with semaphore:
+            return await asyncio.to_thread(send_whatsapp_message, **kwargs)
+
+    return await asyncio.gather(*(send(kw) for kw in payloads), return_exceptions=True)
+
+
 async def run_pipeline(
     hours_back: int = 24,
     limit: int = 20,
@@ -32,14 +110,15 @@ async def run_pipeline(
     """
 
     try:
-        print("\n======================================================")
-        print("📧 EMAIL PIPELINE STARTED (v1 - Scheduled Mode)")
-        print("======================================================")
+        log.info("📧 EMAIL PIPELINE STARTED (v1 - Scheduled Mode)")
 
         # -------------------------------------------------
         # ⏱️ Compute rolling time window (UTC)
         # -------------------------------------------------
-        end_time = datetime.utcnow()
+        # One aware clock reading per run, reused for the window, alerts and the result
+        now = datetime.now(timezone.utc)
+        now_str = now.strftime(RECEIVED_TIME_FORMAT)
+        end_time = now
         start_time = end_time - timedelta(hours=hours_back)
 
         # Gmail reader expects dd-mm-yyyy
@@ -56,11 +135,11 @@ async def run_pipeline(
         gmail_start_date = start_time.strftime("%d-%m-%Y")
         gmail_end_date = (end_time + timedelta(days=1)).strftime("%d-%m-%Y")
         
-        print(f"[TIME] Window: last {hours_back} hours")
-        print(f"[TIME] Start (UTC): {start_time.isoformat()}")
-        print(f"[TIME] End   (UTC): {end_time.isoformat()}")
-        print(f"[TIME] Gmail after : {gmail_start_date}")
-        print(f"[TIME] Gmail before: {gmail_end_date}")
+        log.info("[TIME] Window: last %d hours", hours_back)
+        log.info("[TIME] Start (UTC): %s", start_time.isoformat())
+        log.info("[TIME] End   (UTC): %s", end_time.isoformat())
+        log.info("[TIME] Gmail after : %s", gmail_start_date)
+        log.info("[TIME] Gmail before: %s", gmail_end_date)
         
         # -------------------------------------------------
         # # 1️⃣ Fetch Emails
@@ -75,17 +154,20 @@ async def run_pipeline(
 
 
         # -------------------------------------------------
-        # 1️⃣ Fetch Emails
+        # 1️⃣ Fetch Emails (client warm-up overlaps the fetch)
         # -------------------------------------------------
-        if unread:
-            print("[STEP 1] Fetching UNREAD emails...")
-            emails = read_unread_emails(gmail_start_date, gmail_end_date, limit)
-        else:
-            print("[STEP 1] Fetching READ emails...")
-            emails = read_read_emails(start_date, end_date, limit)
+        log.info("[STEP 1] Fetching %s emails...", "UNREAD" if unread else "READ")
+        reader = read_unread_emails if unread else read_read_emails
+        # With the pre-filter on, list headers only: bodies are downloaded below,
+        # for just the emails the pre-filter can't settle
+        fetch_task = asyncio.create_task(asyncio.to_thread(
+            reader, gmail_start_date, gmail_end_date, limit, include_body=not PRE_CLASSIFY_ENABLED
+        ))
+        warmup_task = asyncio.create_task(asyncio.to_thread(_warm_clients))
+        emails, _ = await asyncio.gather(fetch_task, warmup_task)
 
         if not emails:
-            print("[INFO] No emails found in this window.")
+            log.info("No emails found in this window.")
             return {
                 "status": "success",
                 "processed_emails": 0,
@@ -93,70 +175,74 @@ async def run_pipeline(
                 "message": "No new emails in last window",
             }
 
-        print(f"[INFO] Retrieved {len(emails)} email(s).")
+        log.info("Retrieved %d email(s).", len(emails))
 
-        # -------------------------------------------------
-        # 2️⃣ Classify
-        # -------------------------------------------------
-        print("[STEP 2] Classifying emails...")
-        classified_emails = classify_emails_bulk(emails)
+        if PRE_CLASSIFY_ENABLED:
+            # Bulk senders are labelled from headers alone (classify_emails_bulk
+            # re-applies the same check), so only the rest need a body
+            needs_body = [email for email in emails if not pre_classify(email)]
+            log.info("Downloading %d of %d email bodies...", len(needs_body), len(emails))
+            await asyncio.to_thread(hydrate_bodies, needs_body)
+
+            # A body that failed to download drops its email, as a failed full fetch would
+            failed = {email["id"] for email in needs_body if email["body"] is None}
+            if failed:
+                log.warning("Skipping %d email(s) whose body could not be fetched.", len(failed))
+                emails = [email for email in emails if email["id"] not in failed]
 
         # -------------------------------------------------
-        # 3️⃣ Store (idempotent via email ID)
+        # 2️⃣ Classify + 3️⃣ Store (idempotent via email ID), overlapped
         # -------------------------------------------------
-        print("[STEP 3] Storing emails in DB...")
-        insert_emails(classified_emails)
+        log.info("[STEP 2-3] Classifying emails and storing them in DB...")
+        classified_emails = await classify_and_store(emails)
 
         # -------------------------------------------------
         # 4️⃣ Notify High Priority
         # -------------------------------------------------
-        high_priority = [
-            e for e in classified_emails
-            if e.get("priority") == "High Priority"
+        # Filter and marshal in one pass; the send step below is pure I/O
+        payloads = [
+            # fallback_time is shown for emails without a Date header
+            dict(zip(ALERT_FIELDS, _alert_values(email)), fallback_time=now_str)
+            for email in classified_emails
+            if email.get("priority") == "High Priority"
         ]
 
-        print(f"[STEP 4] Sending {len(high_priority)} WhatsApp alert(s)...")
+        log.info("[STEP 4] Sending %d WhatsApp alert(s)...", len(payloads))
+
+        # Resolve every Gmail short link up front, concurrently, before sending
+        link_map = await shorten_many(p["subject"] for p in payloads)
+        for payload in payloads:
+            payload["gmail_short_link"] = link_map[payload["subject"]]
+
+        reset_sandbox_expiry()
+        results = await send_alerts(payloads)
 
         alerts_sent = 0
 
-        for email in high_priority:
-            try:
-                send_whatsapp_message(
-                    subject=email.get("subject", "No Subject"),
-                    sender=email.get("from", "Unknown"),
-                    priority=email.get("priority"),
-                    snippet=email.get("body", ""),
-                    received_time=email.get("date"),
-                )
-                alerts_sent += 1
-
-            except Exception as e:
-                error_msg = str(e)
-
-                # -------------------------------------------------
-                # 🛑 Sandbox Expiry Detection
-                # -------------------------------------------------
-                if "63016" in error_msg:
-                    print("[WARN] WhatsApp sandbox expired.")
-                    send_sandbox_expiry_notification()
-                    break  # Stop further attempts
-
-                print(f"[ERROR] WhatsApp send failed: {error_msg}")
-
-        print("======================================================")
-        print("✅ PIPELINE COMPLETED")
-        print("======================================================")
+        for result in results:
+            if not isinstance(result, Exception):
+                alerts_sent += result is True
+            elif SANDBOX_EXPIRED_CODE not in str(result):
+                log.error("WhatsApp send failed: %s", result)
+
+        # -------------------------------------------------
+        # 🛑 Sandbox Expiry (notice already sent once by the notifier)
+        # -------------------------------------------------
+        if sandbox_expired():
+            log.warning("WhatsApp sandbox expired; remaining alerts were skipped.")
+
+        log.info("✅ PIPELINE COMPLETED")
 
         return {
             "status": "success",
             "processed_emails": len(classified_emails),
             "alerts_sent": alerts_sent,
             "window_hours": hours_back,
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": now.isoformat(),
         }
 
     except Exception as e:
-        print(f"[FATAL] Pipeline failed: {e}")
+        log.exception("[FATAL] Pipeline failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -164,5 +250,4 @@ async def run_pipeline(
 # Local run (manual testing only)
 # =========================================================
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(run_pipeline())
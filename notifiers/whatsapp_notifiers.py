@@ -1,7 +1,12 @@
-from datetime import datetime, timedelta
-from urllib.parse import quote_plus
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable
+from urllib.parse import quote
 
-import requests
 from dotenv import load_dotenv
 from twilio.rest import Client
 
@@ -12,102 +17,190 @@ from configurations.config import (
     TWILIO_WHATSAPP_TO,
     BITLY_ACCESS_TOKEN,  # ensure it's added in your config
 )
+from email_ops.bitly_ops import shorten_url, shorten_urls_async
 
 load_dotenv()  # Ensure environment variables are loaded
 
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# 🔹 Shared Twilio client (one TLS handshake per run, not per alert)
+# ---------------------------------------------------------
+@lru_cache(maxsize=1)
+def _get_twilio_client() -> Client:
+    """Twilio client built on first use and shared (with its connection pool) by all sends."""
+    return Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+
+
+def warm_up() -> None:
+    """Build the shared Twilio client ahead of the first alert (e.g. while emails are fetched)."""
+    if TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN:
+        _get_twilio_client()
+
+
 # ---------------------------------------------------------
 # 🔹 Rate Limiting Config
 # ---------------------------------------------------------
-NOTIFICATION_COOLDOWN = timedelta(minutes=15)  # Minimum gap between alerts per sender
-notification_cache = {}  # sender_email -> last_sent_time
+NOTIFICATION_COOLDOWN_SECONDS = 15 * 60  # Minimum gap between alerts per sender
+NOTIFICATION_CACHE_SIZE = 4096  # senders remembered; least recently alerted are evicted
+
+# sender_email -> last_sent (time.monotonic(): immune to wall-clock jumps), LRU-ordered.
+# Sends run on worker threads, hence the lock.
+notification_cache: "OrderedDict[str, float]" = OrderedDict()
+_notification_lock = threading.Lock()
 
 
 def can_send_notification(sender: str) -> bool:
     """Check if a notification can be sent (rate limiting per sender)."""
-    now = datetime.now()
-    last_sent = notification_cache.get(sender)
-
-    if last_sent and now - last_sent < NOTIFICATION_COOLDOWN:
-        print(f"[RateLimit] ⚠️ Skipping duplicate alert for {sender} (cooldown active).")
-        return False
-
-    notification_cache[sender] = now
+    now = time.monotonic()
+
+    with _notification_lock:
+        last_sent = notification_cache.get(sender)
+        if last_sent is not None and now - last_sent < NOTIFICATION_COOLDOWN_SECONDS:
+            logger.info("⚠️ Skipping duplicate alert for %s (cooldown active).", sender)
+            return False
+
+        notification_cache[sender] = now
+        notification_cache.move_to_end(sender)
+        while len(notification_cache) > NOTIFICATION_CACHE_SIZE:
+            notification_cache.popitem(last=False)
     return True
 
 
 # ---------------------------------------------------------
 # 🔹 Helper: Generate Short Gmail Links (Bitly)
 # ---------------------------------------------------------
+# Bitly calls and the on-disk link memo live in email_ops.bitly_ops: replies and
+# threads sharing a subject cost one API call, in this run and later ones.
+def _gmail_search_link(subject: str) -> str:
+    # Encode subject safely for Gmail query; "/" too, since the search term sits in the URL fragment path
+    return f"https://mail.google.com/mail/u/0/#search/{quote(subject, safe='')}"
+
+
 def shorten_gmail_link(subject: str):
     """Generate a Bitly short link to Gmail search for this subject."""
     if not BITLY_ACCESS_TOKEN:
-        print("[Bitly] ⚠️ Missing BITLY_ACCESS_TOKEN, skipping link shortening.")
+        logger.warning("⚠️ Missing BITLY_ACCESS_TOKEN, skipping link shortening.")
         return None
+    return shorten_url(_gmail_search_link(subject))
+
+
+async def shorten_many(subjects: Iterable[str]) -> Dict[str, str]:
+    """
+    Shorten the Gmail links for a whole alert batch concurrently (one Bitly call per
+    distinct, not yet shortened subject). A link that fails to shorten falls back to
+    the full Gmail link; without a Bitly token every subject maps to "".
+    """
+    unique_subjects = list(dict.fromkeys(subjects))
+    if not BITLY_ACCESS_TOKEN:  # Bitly disabled (e.g. CI): no URLs, no connection
+        logger.warning("⚠️ Missing BITLY_ACCESS_TOKEN, skipping link shortening.")
+        return dict.fromkeys(unique_subjects, "")
+
+    links = await shorten_urls_async([_gmail_search_link(s) for s in unique_subjects])
+    return dict(zip(unique_subjects, links))
+
+
+# ---------------------------------------------------------
+# 🛑 Sandbox expiry state (error 63016)
+# ---------------------------------------------------------
+# Set by the first send that hits 63016: later (and concurrently queued) sends skip
+# Twilio, and the expiry notice goes out once. Cleared per run by reset_sandbox_expiry().
+_sandbox_expired = threading.Event()
+_sandbox_lock = threading.Lock()
+SANDBOX_EXPIRED_CODE = "63016"
+
+
+def sandbox_expired() -> bool:
+    return _sandbox_expired.is_set()
+
 
+def reset_sandbox_expiry() -> None:
+    _sandbox_expired.clear()
+
+
+def _mark_sandbox_expired() -> None:
+    """Record the expiry; only the first caller sends the expiry notice."""
+    with _sandbox_lock:
+        if _sandbox_expired.is_set():
+            return
+        _sandbox_expired.set()
+
+    logger.warning("🛑 WhatsApp sandbox expired, sending rejoin notice.")
     try:
-        # Encode subject safely for Gmail query
-        encoded_subject = quote_plus(subject)
-        gmail_web_link = f"https://mail.google.com/mail/u/0/#search/{encoded_subject}"
-
-        response = requests.post(
-            "https://api-ssl.bitly.com/v4/shorten",
-            headers={
-                "Authorization": f"Bearer {BITLY_ACCESS_TOKEN}",
-                "Content-Type": "application/json",
-            },
-            json={"long_url": gmail_web_link},
-        )
-        response.raise_for_status()
-        short_url = response.json().get("link")
-        print(f"[Bitly] 🔗 Short Gmail link generated: {short_url}")
-        return short_url
+        send_sandbox_expiry_notification()
     except Exception as e:
-        print(f"[Bitly] ❌ Failed to shorten link: {e}")
-        return None
+        logger.error("❌ Failed to send sandbox expiry notice: %s", e)
 
 
 # ---------------------------------------------------------
 # 🔹 Send WhatsApp Notification via Twilio
 # ---------------------------------------------------------
-def send_whatsapp_message(subject: str, sender: str, priority: str, snippet: str, received_time: str = None):
-    """Send WhatsApp message via Twilio for high-priority emails."""
-    print("[Twilio] Preparing WhatsApp notification...")
+RECEIVED_TIME_FORMAT = "%d-%m-%Y %H:%M"
+
+# 📨 WhatsApp Message Template (filled with str.format per alert)
+WHATSAPP_TEMPLATE = (
+    "🚨 *High Priority Email Alert*\n\n"
+    "📧 *From:* {sender}\n"
+    "🗒️ *Subject:* {subject}\n"
+    "⚡ *Priority:* {priority}\n\n"
+    "📝 *Body Preview:*\n{preview}\n\n"
+    "📅 *Received:* {received}\n"
+    "{link_line}"
+    "\n🔕 Reply STOP to mute alerts temporarily."
+)
+GMAIL_LINK_LINE = "\n📨 *Open in Gmail (App / Web):* {link}\n"
+
+
+def send_whatsapp_message(
+    subject: str,
+    sender: str,
+    priority: str,
+    snippet: str,
+    received_time: str = None,
+    gmail_short_link: str = None,
+    fallback_time: str = None,
+    snippet_truncated: bool = False,
+) -> bool:
+    """
+    Send WhatsApp message via Twilio for high-priority emails.
+    Pass `gmail_short_link` when already resolved (see shorten_many) to skip the Bitly call,
+    and `fallback_time` (formatted once per run) to show when `received_time` is missing.
+    `snippet` is shown as-is (the reader's body_preview); `snippet_truncated` says it was cut.
+    Returns True if a message went out, False if skipped; Twilio errors are re-raised
+    so the caller can react to them (e.g. 63016 = sandbox expired).
+    """
+    logger.info("Preparing WhatsApp notification...")
 
     # Validate credentials
     if not all([TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_WHATSAPP_FROM, TWILIO_WHATSAPP_TO]):
-        print("[Twilio] ⚠️ Missing Twilio credentials in environment variables.")
-        return
+        logger.warning("⚠️ Missing Twilio credentials in environment variables.")
+        return False
+
+    if _sandbox_expired.is_set():
+        logger.info("⏭️ Sandbox expired, skipping notification.")
+        return False
 
     if not can_send_notification(sender):
-        return
+        return False
 
     try:
-        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+        client = _get_twilio_client()
 
-        # Generate Gmail link (Bitly short link)
-        gmail_short_link = shorten_gmail_link(subject)
+        # Generate Gmail link (Bitly short link) unless the caller resolved it
+        if gmail_short_link is None:
+            gmail_short_link = shorten_gmail_link(subject)
 
-        # Truncate long email snippets
-        MAX_BODY_LENGTH = 600
-        truncated = snippet[:MAX_BODY_LENGTH] + (
-            "\n\n...(truncated preview)" if len(snippet) > MAX_BODY_LENGTH else ""
-        )
+        truncated = snippet + ("\n\n...(truncated preview)" if snippet_truncated else "")
 
-        # 📨 WhatsApp Message Template
-        body = (
-            "🚨 *High Priority Email Alert*\n\n"
-            f"📧 *From:* {sender}\n"
-            f"🗒️ *Subject:* {subject}\n"
-            f"⚡ *Priority:* {priority}\n\n"
-            f"📝 *Body Preview:*\n{truncated}\n\n"
-            f"📅 *Received:* {received_time or datetime.now().strftime('%d-%m-%Y %H:%M')}\n"
+        body = WHATSAPP_TEMPLATE.format(
+            sender=sender,
+            subject=subject,
+            priority=priority,
+            preview=truncated,
+            received=received_time or fallback_time or datetime.now().strftime(RECEIVED_TIME_FORMAT),
+            link_line=GMAIL_LINK_LINE.format(link=gmail_short_link) if gmail_short_link else "",
         )
 
-        if gmail_short_link:
-            body += f"\n📨 *Open in Gmail (App / Web):* {gmail_short_link}\n"
-
-        body += "\n🔕 Reply STOP to mute alerts temporarily."
-
         # Send WhatsApp Message
         message = client.messages.create(
             from_=TWILIO_WHATSAPP_FROM,
@@ -115,17 +208,21 @@ def send_whatsapp_message(subject: str, sender: str, priority: str, snippet: str
             to=TWILIO_WHATSAPP_TO
         )
 
-        print(f"[Twilio] ✅ WhatsApp notification sent successfully (SID: {message.sid})\n")
+        logger.info("✅ WhatsApp notification sent successfully (SID: %s)", message.sid)
+        return True
 
     except Exception as e:
-        print(f"[Twilio] ❌ Failed to send WhatsApp message: {e}")
+        logger.error("❌ Failed to send WhatsApp message: %s", e)
+        if SANDBOX_EXPIRED_CODE in str(e):
+            _mark_sandbox_expired()
+        raise
 
 
 # ---------------------------------------------------------
 # 🛑 Sandbox Expiry Notifier (SAME WhatsApp)
 # ---------------------------------------------------------
 def send_sandbox_expiry_notification():
-    client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+    client = _get_twilio_client()
 
     body = (
         "⚠️ *WhatsApp Sandbox Expired*\n\n"
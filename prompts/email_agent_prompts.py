@@ -1,4 +1,10 @@
-EMAIL_CLASSIFIER_PROMPTS = f"""
+import sys
+
+from configurations.config import MAX_BODY_CHARS
+
+# System prompt for single-email classification; the email itself goes in the user message.
+# Interned: every message built from it shares this one object.
+EMAIL_CLASSIFIER_SYSTEM = sys.intern("""
 You are an intelligent email classifier designed to prioritize important messages.
 Based on the email content, determine if it is "High Priority" or "Low Priority".
 
@@ -7,8 +13,64 @@ Consider:
 - Low Priority: Newsletters, ads, social updates, automated notifications.
 
 Respond strictly in JSON format:
-{{
+{
   "priority": "<High Priority or Low Priority>",
   "reason": "<brief reason for classification>"
-}}
+}
+""")
+
+# Structured output: the API itself guarantees a reply of exactly this shape
+EMAIL_CLASSIFIER_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "priority": {"type": "string", "enum": ["High Priority", "Low Priority"]},
+        "reason": {"type": "string"},
+    },
+    "required": ["priority", "reason"],
+    "additionalProperties": False,
+}
+
+# Batch variant: one result per numbered email, wrapped in an object (schemas must be objects at the top)
+EMAIL_BATCH_CLASSIFIER_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "results": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"index": {"type": "integer"}, **EMAIL_CLASSIFIER_SCHEMA["properties"]},
+                "required": ["index", "priority", "reason"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["results"],
+    "additionalProperties": False,
+}
+
+EMAIL_BATCH_CLASSIFIER_PROMPTS = """
+You are an intelligent email classifier designed to prioritize important messages.
+You will receive several numbered emails. For each one, determine if it is "High Priority" or "Low Priority".
+
+Consider:
+- High Priority: Important work emails, recruiter messages, job opportunities, interviews, client or manager emails, deadlines, project updates.
+- Low Priority: Newsletters, ads, social updates, automated notifications.
+
+Respond strictly in JSON format, with exactly one result per email:
+{
+  "results": [
+    {"index": <email number>, "priority": "<High Priority or Low Priority>", "reason": "<brief reason>"}
+  ]
+}
 """
+
+
+def truncate_body(body: str) -> str:
+    """Trim an email body to MAX_BODY_CHARS before it goes into an LLM prompt."""
+    body = body or ""
+    if len(body) <= MAX_BODY_CHARS:
+        return body
+
+    print(f"[Prompt] ✂️ Body truncated to {MAX_BODY_CHARS}/{len(body)} chars "
+          f"({MAX_BODY_CHARS / len(body):.0%} kept).")
+    return body[:MAX_BODY_CHARS]